@@ -1,10 +1,19 @@
 """Build NetworkX graph from parsed C++ files."""
 
+import heapq
+import posixpath
+import random
 from pathlib import Path
 from typing import Any
 
 import networkx as nx
 
+try:
+    import igraph as ig
+    HAS_IGRAPH = True
+except ImportError:
+    HAS_IGRAPH = False
+
 from .parser import FileInfo
 
 
@@ -17,31 +26,41 @@ def build_dependency_graph(files: list[FileInfo], root_path: Path) -> nx.DiGraph
     """
     G = nx.DiGraph()
     
-    # Build filename lookup for resolving includes
-    # Use lists to handle multiple files with same name
+    # Single pass over files: relative path (computed once and used as the
+    # node key), include lookups and node creation.
+    # Lookups use lists to handle multiple files with same name.
     file_lookup: dict[str, list[FileInfo]] = {}
+    # Every trailing run of path components ("UI/Widget.h" for
+    # "Source/UI/Widget.h") so partial includes resolve with one dict lookup
+    suffix_index: dict[str, list[FileInfo]] = {}
+    # Nodes and edges are collected and added in bulk
+    nodes: list[tuple[str, dict[str, Any]]] = []
     for f in files:
+        # Always '/'-separated (also on Windows): include resolution and the
+        # suffix index work on POSIX-style paths
+        try:
+            rel_path = f.path.relative_to(root_path).as_posix()
+        except ValueError:
+            rel_path = f.path.as_posix()
+        f.rel_path = rel_path
+        
         # Store by filename
-        name = f.path.name
+        name = f.name
         if name not in file_lookup:
             file_lookup[name] = []
         file_lookup[name].append(f)
         
         # Store by relative path
-        try:
-            rel_path = str(f.path.relative_to(root_path))
-            if rel_path not in file_lookup:
-                file_lookup[rel_path] = []
-            file_lookup[rel_path].append(f)
-        except ValueError:
-            pass
-    
-    # Add nodes with attributes
-    for f in files:
-        try:
-            rel_path = str(f.path.relative_to(root_path))
-        except ValueError:
-            rel_path = str(f.path)
+        if rel_path not in file_lookup:
+            file_lookup[rel_path] = []
+        file_lookup[rel_path].append(f)
+        
+        parts = rel_path.split('/')
+        for i in range(len(parts)):
+            suffix = '/'.join(parts[i:])
+            if suffix not in suffix_index:
+                suffix_index[suffix] = []
+            suffix_index[suffix].append(f)
         
         node_attrs = {
             'path': rel_path,
@@ -56,20 +75,23 @@ def build_dependency_graph(files: list[FileInfo], root_path: Path) -> nx.DiGraph
             # Complexity metric for 4th dimension
             'complexity': len(f.classes) + len(f.structs) + len(f.functions),
         }
-        G.add_node(rel_path, **node_attrs)
+        nodes.append((rel_path, node_attrs))
+    G.add_nodes_from(nodes)
     
-    # Add edges based on includes
+    # Add edges based on includes. Every edge is an include, so no per-edge
+    # 'type' attribute is stored; readers default it to 'include'
+    edges: list[tuple[str, str]] = []
     for f in files:
-        try:
-            src_path = str(f.path.relative_to(root_path))
-        except ValueError:
-            src_path = str(f.path)
+        src_path = f.rel_path
         
         for include in f.includes:
             # Try to resolve include to actual file
-            target = _resolve_include(include, file_lookup, root_path, f)
-            if target and target in G.nodes:
-                G.add_edge(src_path, target, type='include')
+            target = _resolve_include(
+                include, file_lookup, suffix_index, f
+            )
+            if target:
+                edges.append((src_path, target))
+    G.add_edges_from(edges)
     
     return G
 
@@ -77,60 +99,65 @@ def build_dependency_graph(files: list[FileInfo], root_path: Path) -> nx.DiGraph
 def _resolve_include(
     include: str,
     lookup: dict[str, list[FileInfo]],
-    root: Path,
+    suffix_index: dict[str, list[FileInfo]],
     source_file: FileInfo | None = None
 ) -> str | None:
-    """Resolve an include path to a file in our graph."""
-    include_name = Path(include).name
+    """Resolve an include path to a file in our graph.
     
-    def to_rel_path(f: FileInfo) -> str | None:
-        try:
-            return str(f.path.relative_to(root))
-        except ValueError:
-            return str(f.path)
+    Returns the rel_path of a file from the lookup (always a graph node), or None.
+    """
+    include_name = Path(include).name
+    source_dir = source_file.parent if source_file else None
     
-    # 1. Try relative to source file's directory first
+    # 1. Try relative to source file's directory first.
+    # Every file in scope is in the lookup, so this is a dict check instead
+    # of a filesystem stat per include
     if source_file:
-        source_dir = source_file.path.parent
-        candidate = source_dir / include
-        if candidate.exists():
-            try:
-                return str(candidate.relative_to(root))
-            except ValueError:
-                pass
+        candidate = posixpath.normpath(
+            posixpath.join(posixpath.dirname(source_file.rel_path), include)
+        )
+        for f in lookup.get(candidate, ()):
+            if f.rel_path == candidate:
+                return candidate
     
     # 2. Try exact path match
     if include in lookup and lookup[include]:
-        return to_rel_path(lookup[include][0])
+        return lookup[include][0].rel_path
     
     # 3. Try filename match - prefer file in same directory as source
     if include_name in lookup:
         candidates = lookup[include_name]
         if source_file and len(candidates) > 1:
             # Prefer same directory
-            source_dir = source_file.path.parent
             for f in candidates:
-                if f.path.parent == source_dir:
-                    return to_rel_path(f)
+                if f.parent == source_dir:
+                    return f.rel_path
         # Return first match
         if candidates:
-            return to_rel_path(candidates[0])
+            return candidates[0].rel_path
     
     # 4. Try partial path match (e.g., "UI/Widget.h" matches "Source/UI/Widget.h")
-    for path_str, files in lookup.items():
-        if files and (path_str.endswith(include) or path_str.endswith('/' + include)):
-            return to_rel_path(files[0])
+    hits = suffix_index.get(include)
+    if hits:
+        return hits[0].rel_path
     
     return None
 
 
 def get_graph_stats(G: nx.DiGraph) -> dict[str, Any]:
     """Get statistics about the dependency graph."""
+    headers = sources = 0
+    for _, is_header in G.nodes(data='is_header'):
+        if is_header:
+            headers += 1
+        else:
+            sources += 1
+    
     return {
         'total_files': G.number_of_nodes(),
         'total_dependencies': G.number_of_edges(),
-        'headers': sum(1 for _, d in G.nodes(data=True) if d.get('is_header')),
-        'sources': sum(1 for _, d in G.nodes(data=True) if not d.get('is_header')),
+        'headers': headers,
+        'sources': sources,
         'most_depended': _get_most_depended(G, 5),
         'most_dependencies': _get_most_dependencies(G, 5),
     }
@@ -138,14 +165,12 @@ def get_graph_stats(G: nx.DiGraph) -> dict[str, Any]:
 
 def _get_most_depended(G: nx.DiGraph, n: int) -> list[tuple[str, int]]:
     """Get files that are included by the most other files."""
-    in_degrees = [(node, G.in_degree(node)) for node in G.nodes()]
-    return sorted(in_degrees, key=lambda x: x[1], reverse=True)[:n]
+    return heapq.nlargest(n, G.in_degree(), key=lambda x: x[1])
 
 
 def _get_most_dependencies(G: nx.DiGraph, n: int) -> list[tuple[str, int]]:
     """Get files that include the most other files."""
-    out_degrees = [(node, G.out_degree(node)) for node in G.nodes()]
-    return sorted(out_degrees, key=lambda x: x[1], reverse=True)[:n]
+    return heapq.nlargest(n, G.out_degree(), key=lambda x: x[1])
 
 
 def compute_hierarchy_levels(G: nx.DiGraph) -> dict[str, int]:
@@ -153,45 +178,43 @@ def compute_hierarchy_levels(G: nx.DiGraph) -> dict[str, int]:
     Compute hierarchy level for each node based on dependency depth.
     Level 0 = leaf nodes (no outgoing edges / don't include anything)
     Higher levels = depend on more layers
+    
+    Include cycles are collapsed into a single component first, so every
+    file in a cycle shares one level. Runs in O(V + E) without recursion.
     """
-    levels: dict[str, int] = {}
-    
-    # Find all nodes with no outgoing edges (leaf/base files)
-    leaves = [n for n in G.nodes() if G.out_degree(n) == 0]
-    for leaf in leaves:
-        levels[leaf] = 0
-    
-    # BFS from leaves upward
-    def get_level(node: str, visited: set) -> int:
-        if node in levels:
-            return levels[node]
-        if node in visited:
-            return 0  # Cycle detected, break it
-        
-        visited.add(node)
-        successors = list(G.successors(node))  # Files this node includes
-        if not successors:
-            levels[node] = 0
-        else:
-            max_child_level = max(get_level(s, visited) for s in successors)
-            levels[node] = max_child_level + 1
-        
-        return levels[node]
+    scc = nx.condensation(G)
+    order = list(nx.topological_sort(scc))
     
-    for node in G.nodes():
-        if node not in levels:
-            get_level(node, set())
+    # Reverse topological order visits dependencies before their dependents
+    scc_levels = [0] * len(order)
+    for component in reversed(order):
+        scc_levels[component] = max(
+            (scc_levels[child] + 1 for child in scc.successors(component)),
+            default=0,
+        )
     
-    return levels
+    mapping = scc.graph['mapping']
+    return {node: scc_levels[mapping[node]] for node in G.nodes()}
 
 
 def detect_communities(G: nx.DiGraph) -> dict[str, int]:
     """
     Detect communities/modules in the codebase using Louvain algorithm.
     Returns mapping of node -> community_id
+    
+    Uses igraph's C implementation when installed, otherwise NetworkX.
     """
-    # Convert to undirected for community detection
-    G_undirected = G.to_undirected()
+    if HAS_IGRAPH:
+        try:
+            return _detect_communities_igraph(G)
+        except Exception:
+            pass  # Fall back to NetworkX below
+    
+    # Undirected structure only: to_undirected() would deep-copy every node's
+    # attribute dict, which Louvain never reads
+    G_undirected = nx.Graph()
+    G_undirected.add_nodes_from(G)
+    G_undirected.add_edges_from(G.edges())
     
     try:
         communities = nx.community.louvain_communities(G_undirected, seed=42)
@@ -205,13 +228,34 @@ def detect_communities(G: nx.DiGraph) -> dict[str, int]:
         return {node: 0 for node in G.nodes()}
 
 
+def _detect_communities_igraph(G: nx.DiGraph) -> dict[str, int]:
+    """Louvain (multilevel) community detection via igraph."""
+    index = {node: i for i, node in enumerate(G.nodes())}
+    g = ig.Graph(
+        n=len(index),
+        edges=((index[u], index[v]) for u, v in G.edges()),
+        directed=False,
+    )
+    # Merge A->B / B->A into one edge, as G.to_undirected() would
+    g.simplify(multiple=True, loops=False)
+    
+    # Seed igraph's RNG so community ids are stable between runs
+    ig.set_random_number_generator(random.Random(42))
+    try:
+        membership = g.community_multilevel(resolution=1.0).membership
+    finally:
+        ig.set_random_number_generator(random)
+    
+    return {node: membership[i] for node, i in index.items()}
+
+
 def enrich_graph_with_analysis(G: nx.DiGraph) -> nx.DiGraph:
     """Add hierarchy levels and community info to graph nodes."""
     levels = compute_hierarchy_levels(G)
     communities = detect_communities(G)
     
-    for node in G.nodes():
-        G.nodes[node]['level'] = levels.get(node, 0)
-        G.nodes[node]['community'] = communities.get(node, 0)
+    # Both mappings cover every node, so they can be applied in bulk
+    nx.set_node_attributes(G, levels, 'level')
+    nx.set_node_attributes(G, communities, 'community')
     
     return G
@@ -24,6 +24,17 @@ def main():
         default=Path('code_graph.html'),
         help='Output HTML file path (default: code_graph.html)'
     )
+    parser.add_argument(
+        '--gzip',
+        action='store_true',
+        help='Also write a gzip-compressed copy of the output (<output>.gz)'
+    )
+    parser.add_argument(
+        '--precompute-layout',
+        action='store_true',
+        help="Compute node positions in Python instead of in the browser "
+             "(needs the 'layout' extra)"
+    )
     parser.add_argument(
         '--no-open',
         action='store_true',
@@ -73,7 +84,17 @@ def main():
         print(f"   Most included: {top[0]} ({top[1]} times)")
     
     print(f"🎨 Generating visualization...")
-    output_path = generate_html(graph, args.output, title=f"Code Graph: {args.path.name}")
+    try:
+        output_path = generate_html(
+            graph,
+            args.output,
+            title=f"Code Graph: {args.path.name}",
+            compress=args.gzip,
+            precompute_layout=args.precompute_layout,
+        )
+    except ImportError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
     print(f"✅ Output: {output_path.absolute()}")
     
     if not args.no_open:
@@ -1,29 +1,67 @@
 """C++ source file parser using tree-sitter."""
 
+import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from dataclasses import dataclass, field
 from typing import Optional
 
 try:
     import tree_sitter_cpp as tscpp
-    from tree_sitter import Language, Parser
+    from tree_sitter import Language, Parser, Query, QueryCursor
     HAS_TREE_SITTER = True
 except ImportError:
     HAS_TREE_SITTER = False
 
 
-@dataclass
+@dataclass(slots=True)
 class FileInfo:
     """Parsed information from a C++ file."""
     path: Path
-    includes: list[str] = field(default_factory=list)
-    classes: list[str] = field(default_factory=list)
-    structs: list[str] = field(default_factory=list)
-    functions: list[str] = field(default_factory=list)
-    global_vars: list[str] = field(default_factory=list)
+    # Immutable once parsed; names are interned since they repeat across files
+    includes: tuple[str, ...] = ()
+    classes: tuple[str, ...] = ()
+    structs: tuple[str, ...] = ()
+    functions: tuple[str, ...] = ()
+    global_vars: tuple[str, ...] = ()
     is_header: bool = False
     line_count: int = 0
+    # Derived from path once, as graph building reads them for every include
+    parent: Path = field(init=False, repr=False, compare=False)
+    name: str = field(init=False, repr=False, compare=False)
+    # Path relative to the analyzed root; filled in by build_dependency_graph
+    rel_path: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.parent = self.path.parent
+        self.name = self.path.name
+
+
+# Free functions only: member definitions (`Foo::bar`) have a qualified_identifier
+# declarator and are deliberately not matched.
+DECLARATION_QUERY = """
+(class_specifier name: (type_identifier) @class)
+(struct_specifier name: (type_identifier) @struct)
+(function_definition declarator: (function_declarator declarator: (identifier) @function))
+(translation_unit (declaration) @global_var)
+"""
+
+# Built once per process and shared by every CppParser
+_TSCPP_LANG = Language(tscpp.language()) if HAS_TREE_SITTER else None
+_DECLARATION_QUERY = Query(_TSCPP_LANG, DECLARATION_QUERY) if HAS_TREE_SITTER else None
+
+
+_RE_INCLUDE = re.compile(rb'#include\s*[<"]([^>"]+)[>"]')
+_RE_CLASS = re.compile(r'\bclass\s+(?:MULTIAGENT_API\s+)?(\w+)')
+_RE_STRUCT = re.compile(r'\bstruct\s+(?:MULTIAGENT_API\s+)?(\w+)')
+_RE_FUNC = re.compile(r'^(?:[\w:*&<>]+\s+)+(\w+)\s*\([^)]*\)\s*(?:const)?\s*{', re.MULTILINE)
+
+
+def _node_text(node, content: bytes) -> str:
+    """Decode (and intern) the source bytes spanned by a tree-sitter node."""
+    return sys.intern(content[node.start_byte:node.end_byte].decode('utf-8', 'replace'))
 
 
 class CppParser:
@@ -31,30 +69,36 @@ class CppParser:
     
     HEADER_EXTENSIONS = {'.h', '.hpp', '.hxx', '.h++', '.hh'}
     SOURCE_EXTENSIONS = {'.cpp', '.cxx', '.cc', '.c++', '.c'}
+    CPP_EXTENSIONS = HEADER_EXTENSIONS | SOURCE_EXTENSIONS
     
     def __init__(self):
         self.parser: Optional[Parser] = None
+        self.query: Optional[Query] = None
         if HAS_TREE_SITTER:
             self._init_tree_sitter()
     
     def _init_tree_sitter(self):
-        """Initialize tree-sitter parser."""
-        self.parser = Parser(Language(tscpp.language()))
+        """Initialize tree-sitter parser and declaration query."""
+        self.parser = Parser(_TSCPP_LANG)
+        self.query = _DECLARATION_QUERY
     
     def parse_file(self, filepath: Path) -> Optional[FileInfo]:
         """Parse a single C++ file."""
-        if not self._is_cpp_file(filepath):
+        suffix = filepath.suffix.lower()
+        if suffix not in self.CPP_EXTENSIONS:
             return None
         
+        # Read raw bytes once: tree-sitter parses bytes directly, so only the
+        # identifiers we keep get decoded
         try:
-            content = filepath.read_text(encoding='utf-8', errors='ignore')
+            content = filepath.read_bytes()
         except Exception:
             return None
         
         info = FileInfo(
             path=filepath,
-            is_header=filepath.suffix.lower() in self.HEADER_EXTENSIONS,
-            line_count=content.count('\n') + 1
+            is_header=suffix in self.HEADER_EXTENSIONS,
+            line_count=content.count(b'\n') + 1
         )
         
         # Always use regex for includes (more reliable with various encodings)
@@ -64,116 +108,99 @@ class CppParser:
         if self.parser and HAS_TREE_SITTER:
             self._parse_declarations_ts(content, info)
         else:
-            self._parse_declarations_regex(content, info)
+            self._parse_declarations_regex(content.decode('utf-8', 'ignore'), info)
         
         return info
     
-    def _is_cpp_file(self, filepath: Path) -> bool:
-        """Check if file is a C++ source or header."""
-        return filepath.suffix.lower() in (self.HEADER_EXTENSIONS | self.SOURCE_EXTENSIONS)
-    
-    def _parse_includes_regex(self, content: str, info: FileInfo):
+    def _parse_includes_regex(self, content: bytes, info: FileInfo):
         """Extract #include directives using regex (reliable)."""
-        include_pattern = r'#include\s*[<"]([^>"]+)[>"]'
-        info.includes = re.findall(include_pattern, content)
-    
-    def _parse_declarations_ts(self, content: str, info: FileInfo):
-        """Parse declarations using tree-sitter."""
-        tree = self.parser.parse(bytes(content, 'utf-8'))
-        self._extract_declarations_ts(tree.root_node, content, info)
+        info.includes = tuple(
+            sys.intern(inc.decode('utf-8', 'replace')) for inc in _RE_INCLUDE.findall(content)
+        )
     
-    def _extract_declarations_ts(self, node, content: str, info: FileInfo):
-        """Extract classes, structs, functions from AST."""
-        if node.type == 'class_specifier':
-            name = self._get_name_from_node(node, content)
-            if name:
-                info.classes.append(name)
-        
-        elif node.type == 'struct_specifier':
-            name = self._get_name_from_node(node, content)
-            if name:
-                info.structs.append(name)
+    def _parse_declarations_ts(self, content: bytes, info: FileInfo):
+        """Parse declarations using a tree-sitter query (traversal runs in C)."""
+        tree = self.parser.parse(content)
+        captures = QueryCursor(self.query).captures(tree.root_node)
         
-        elif node.type == 'function_definition':
-            name = self._get_function_name(node, content)
-            if name and not self._is_member_function(node):
-                info.functions.append(name)
+        # Capture lists come back in no stable order; sort into source order
+        def in_source_order(name):
+            return sorted(captures.get(name, ()), key=lambda node: node.start_byte)
         
-        elif node.type == 'declaration':
-            if self._is_global_var_declaration(node):
-                name = self._get_var_name(node, content)
-                if name:
-                    info.global_vars.append(name)
+        info.classes = tuple(_node_text(node, content) for node in in_source_order('class'))
+        info.structs = tuple(_node_text(node, content) for node in in_source_order('struct'))
+        info.functions = tuple(
+            _node_text(node, content) for node in in_source_order('function')
+        )
         
-        for child in node.children:
-            self._extract_declarations_ts(child, content, info)
-    
-    def _get_name_from_node(self, node, content: str) -> Optional[str]:
-        """Get name identifier from class/struct node."""
-        for child in node.children:
-            if child.type == 'type_identifier':
-                return content[child.start_byte:child.end_byte]
-        return None
-    
-    def _get_function_name(self, node, content: str) -> Optional[str]:
-        """Get function name from function_definition node."""
-        for child in node.children:
-            if child.type == 'function_declarator':
-                for subchild in child.children:
-                    if subchild.type == 'identifier':
-                        return content[subchild.start_byte:subchild.end_byte]
-                    elif subchild.type == 'qualified_identifier':
-                        return content[subchild.start_byte:subchild.end_byte]
-        return None
-    
-    def _is_member_function(self, node) -> bool:
-        """Check if function is a class member (has :: in name)."""
-        for child in node.children:
-            if child.type == 'function_declarator':
-                for subchild in child.children:
-                    if subchild.type == 'qualified_identifier':
-                        return True
-        return False
-    
-    def _is_global_var_declaration(self, node) -> bool:
-        """Check if declaration is at global scope."""
-        return node.parent and node.parent.type == 'translation_unit'
+        global_vars = []
+        for node in in_source_order('global_var'):
+            name = self._get_var_name(node, content)
+            if name:
+                global_vars.append(name)
+        info.global_vars = tuple(global_vars)
     
-    def _get_var_name(self, node, content: str) -> Optional[str]:
+    def _get_var_name(self, node, content: bytes) -> Optional[str]:
         """Get variable name from declaration."""
         for child in node.children:
             if child.type == 'init_declarator':
                 for subchild in child.children:
                     if subchild.type == 'identifier':
-                        return content[subchild.start_byte:subchild.end_byte]
+                        return _node_text(subchild, content)
             elif child.type == 'identifier':
-                return content[child.start_byte:child.end_byte]
+                return _node_text(child, content)
         return None
     
     def _parse_declarations_regex(self, content: str, info: FileInfo):
         """Fallback regex-based parsing for declarations."""
         # Extract classes
-        class_pattern = r'\bclass\s+(?:MULTIAGENT_API\s+)?(\w+)'
-        info.classes = re.findall(class_pattern, content)
+        info.classes = tuple(map(sys.intern, _RE_CLASS.findall(content)))
         
         # Extract structs
-        struct_pattern = r'\bstruct\s+(?:MULTIAGENT_API\s+)?(\w+)'
-        info.structs = re.findall(struct_pattern, content)
+        info.structs = tuple(map(sys.intern, _RE_STRUCT.findall(content)))
         
         # Extract global functions (simplified)
-        func_pattern = r'^(?:[\w:*&<>]+\s+)+(\w+)\s*\([^)]*\)\s*(?:const)?\s*{'
-        info.functions = re.findall(func_pattern, content, re.MULTILINE)
+        info.functions = tuple(map(sys.intern, _RE_FUNC.findall(content)))
+
+
+_worker_parser: Optional[CppParser] = None
+
+
+def _parse_one(filepath: Path) -> Optional[FileInfo]:
+    """Parse a file with this process's shared parser (pool worker entry point)."""
+    global _worker_parser
+    if _worker_parser is None:
+        _worker_parser = CppParser()
+    return _worker_parser.parse_file(filepath)
+
+
+_CPP_SUFFIXES = tuple(CppParser.CPP_EXTENSIONS)
+
+
+def _walk_cpp_files(root_path: Path):
+    """Yield C++ files under root_path using os.scandir.
+    
+    DirEntry caches the type from the directory read, so no per-entry stat
+    is needed, and Path objects are only built for matching files.
+    """
+    stack = [str(root_path)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith(_CPP_SUFFIXES) and entry.is_file():
+                        yield Path(entry.path)
+        except OSError:
+            continue
 
 
 def scan_directory(root_path: Path) -> list[FileInfo]:
-    """Scan directory recursively for C++ files."""
-    parser = CppParser()
-    results = []
-    
-    for filepath in root_path.rglob('*'):
-        if filepath.is_file():
-            info = parser.parse_file(filepath)
-            if info:
-                results.append(info)
+    """Scan directory recursively for C++ files, parsing them in parallel."""
+    paths = list(_walk_cpp_files(root_path))
     
-    return results
+    with ProcessPoolExecutor() as executor:
+        results = executor.map(_parse_one, paths, chunksize=32)
+        return [info for info in results if info]
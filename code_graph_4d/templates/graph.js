@@ -1,10 +1,75 @@
 /* Code Graph 4D - JavaScript */
 
+// Graph data ships as an inert JSON block: JSON.parse is much faster than
+// evaluating the same payload as a JS object literal
+const payload = JSON.parse(document.getElementById('graph-data').textContent);
+
+// Nodes and links arrive as one array per attribute; 3d-force-graph needs
+// one object per element, so rebuild those once here
+function fromColumns(columns) {
+    const keys = Object.keys(columns);
+    const length = keys.length ? columns[keys[0]].length : 0;
+    const rows = new Array(length);
+    for (let i = 0; i < length; i++) {
+        const row = {};
+        for (const key of keys) row[key] = columns[key][i];
+        rows[i] = row;
+    }
+    return rows;
+}
+
+const graphData = {
+    nodes: fromColumns(payload.nodes),
+    links: fromColumns(payload.links),
+    metadata: payload.metadata
+};
+
+// Links refer to nodes by position, symbol lists hold indices into the
+// shared string table, and types are codes into the type table
+const S = graphData.metadata.strings;
+const typeTable = graphData.metadata.typeTable;
+graphData.nodes.forEach((node, i) => {
+    node.id = i;
+    node.type = typeTable[node.typeCode];
+});
+graphData.links.forEach((link, i) => {
+    link.idx = i;
+    link.type = typeTable[link.typeCode];
+});
+// A layout precomputed in Python arrives as fixed fx/fy/fz columns; start
+// the nodes there too, since the simulation is not run for them
+const layoutY = payload.nodes.fy;
+const hasLayout = layoutY !== undefined;
+if (hasLayout) {
+    graphData.nodes.forEach(node => {
+        node.x = node.fx;
+        node.y = node.fy;
+        node.z = node.fz;
+    });
+}
+
+// Symbol lists only exist for the nodes that have any
+Object.entries(payload.symbols).forEach(([key, entries]) => {
+    entries.forEach(([i, ids]) => { graphData.nodes[i][key] = ids; });
+});
+
+// Link indices touching each node, built once from the integer endpoint
+// columns (3d-force-graph later swaps link.source/target for objects).
+// Derived here rather than shipped: it is a single O(E) pass and would
+// otherwise add every link index to the payload twice.
+const linkSources = payload.links.source;
+const linkTargets = payload.links.target;
+const nodeLinks = graphData.nodes.map(() => []);
+for (let i = 0; i < linkSources.length; i++) {
+    nodeLinks[linkSources[i]].push(i);
+    nodeLinks[linkTargets[i]].push(i);
+}
+
 // Update stats
 document.getElementById('stat-files').textContent = graphData.nodes.length;
 document.getElementById('stat-deps').textContent = graphData.links.length;
-document.getElementById('stat-headers').textContent = graphData.nodes.filter(n => n.isHeader).length;
-document.getElementById('stat-sources').textContent = graphData.nodes.filter(n => !n.isHeader).length;
+document.getElementById('stat-headers').textContent = graphData.metadata.headerCount;
+document.getElementById('stat-sources').textContent = graphData.metadata.sourceCount;
 document.getElementById('stat-communities').textContent = graphData.metadata.numCommunities;
 document.getElementById('stat-levels').textContent = graphData.metadata.maxLevel;
 
@@ -12,11 +77,8 @@ document.getElementById('stat-levels').textContent = graphData.metadata.maxLevel
 // State & Configuration
 // ============================================================================
 
-const communityColors = [
-    '#e91e63', '#9c27b0', '#673ab7', '#3f51b5', '#2196f3',
-    '#00bcd4', '#009688', '#4caf50', '#8bc34a', '#cddc39',
-    '#ffeb3b', '#ffc107', '#ff9800', '#ff5722', '#795548'
-];
+// Indexed by node.colorIdx; filled in from COMMUNITY_COLORS in visualizer.py
+const communityColors = {{PALETTE}};
 
 let useHierarchy = false;
 let useCommunityColors = true;
@@ -24,8 +86,10 @@ let isLightMode = false;
 let flyMode = false;
 let boundaryVisible = false;
 let highlightedNode = null;
-let highlightedLinks = new Set();
-let highlightedNodes = new Set();
+// Highlight membership as bitmaps indexed by node id / link idx: the
+// color and width accessors run per element on every redraw
+const highlightedLinks = new Uint8Array(graphData.links.length);
+const highlightedNodes = new Uint8Array(graphData.nodes.length);
 
 const themes = {
     dark: {
@@ -60,43 +124,35 @@ const themes = {
 function getNodeColor(node) {
     const theme = isLightMode ? themes.light : themes.dark;
     if (useCommunityColors) {
-        return communityColors[node.community % communityColors.length];
+        return communityColors[node.colorIdx];
     }
     return node.isHeader ? theme.header : theme.source;
 }
 
-function getNodeSize(node) {
-    return node.radius || 5;
-}
-
 function getLinkWidth(link) {
     const weight = link.weight || 1;
-    const baseWidth = highlightedLinks.has(link) ? 4 : 1;
+    const baseWidth = highlightedLinks[link.idx] ? 4 : 1;
     return baseWidth + Math.min(weight, 10) * 0.3;
 }
 
 function getLinkColor(link) {
     const theme = isLightMode ? themes.light : themes.dark;
-    if (highlightedLinks.has(link)) {
+    if (highlightedLinks[link.idx]) {
         return '#ff6b6b';
     }
     return theme.link;
 }
 
 function updateHighlight(node) {
-    highlightedLinks.clear();
-    highlightedNodes.clear();
+    highlightedLinks.fill(0);
+    highlightedNodes.fill(0);
     
     if (node) {
-        highlightedNodes.add(node.id);
-        graphData.links.forEach(link => {
-            const srcId = typeof link.source === 'object' ? link.source.id : link.source;
-            const tgtId = typeof link.target === 'object' ? link.target.id : link.target;
-            if (srcId === node.id || tgtId === node.id) {
-                highlightedLinks.add(link);
-                highlightedNodes.add(srcId);
-                highlightedNodes.add(tgtId);
-            }
+        highlightedNodes[node.id] = 1;
+        nodeLinks[node.id].forEach(i => {
+            highlightedLinks[i] = 1;
+            highlightedNodes[linkSources[i]] = 1;
+            highlightedNodes[linkTargets[i]] = 1;
         });
     }
     highlightedNode = node;
@@ -121,6 +177,10 @@ function applyTheme() {
         .nodeColor(getNodeColor);
 }
 
+function symbolNames(ids) {
+    return ids ? ids.map(i => S[i]) : [];
+}
+
 function updateList(listId, sectionId, items) {
     const list = document.getElementById(listId);
     const section = document.getElementById(sectionId);
@@ -147,12 +207,13 @@ const Graph = ForceGraph3D()
     .graphData(graphData)
     .nodeLabel('path')
     .nodeColor(node => {
-        if (highlightedNode && !highlightedNodes.has(node.id)) {
+        if (highlightedNode && !highlightedNodes[node.id]) {
             return 'rgba(100,100,100,0.3)';
         }
         return getNodeColor(node);
     })
-    .nodeVal(getNodeSize)
+    // Precomputed by graph_to_json (never below 5); read as a plain property
+    .nodeVal('radius')
     .nodeOpacity(0.9)
     .nodeThreeObject(node => {
         const lines = node.lineCount || 10;
@@ -180,8 +241,8 @@ const Graph = ForceGraph3D()
     .linkWidth(getLinkWidth)
     .linkDirectionalArrowLength(6)
     .linkDirectionalArrowRelPos(1)
-    .linkDirectionalArrowColor(link => highlightedLinks.has(link) ? '#ff6b6b' : 'rgba(255,200,120,0.8)')
-    .linkOpacity(link => highlightedLinks.has(link) ? 1 : 0.5)
+    .linkDirectionalArrowColor(link => highlightedLinks[link.idx] ? '#ff6b6b' : 'rgba(255,200,120,0.8)')
+    .linkOpacity(link => highlightedLinks[link.idx] ? 1 : 0.5)
     .backgroundColor('#0a0a0f')
     .onNodeClick(node => {
         if (highlightedNode === node) {
@@ -206,9 +267,9 @@ const Graph = ForceGraph3D()
         document.getElementById('node-level').textContent = node.level;
         document.getElementById('node-community').textContent = node.community;
         
-        updateList('node-classes', 'classes-section', node.classes);
-        updateList('node-structs', 'structs-section', node.structs);
-        updateList('node-functions', 'functions-section', node.functions);
+        updateList('node-classes', 'classes-section', symbolNames(node.classes));
+        updateList('node-structs', 'structs-section', symbolNames(node.structs));
+        updateList('node-functions', 'functions-section', symbolNames(node.functions));
         
         const cam = Graph.camera();
         const dx = cam.position.x - node.x;
@@ -231,6 +292,8 @@ const Graph = ForceGraph3D()
             .linkWidth(getLinkWidth);
     });
 
+if (hasLayout) Graph.cooldownTicks(0);
+
 
 // ============================================================================
 // Controls Event Listeners
@@ -252,10 +315,14 @@ document.getElementById('use-hierarchy').addEventListener('change', (e) => {
             node.fy = node.level * levelSpacing;
         });
     } else {
-        graphData.nodes.forEach(node => {
-            node.fy = undefined;
+        // Back to the precomputed position, or free for the simulation
+        graphData.nodes.forEach((node, i) => {
+            node.fy = hasLayout ? layoutY[i] : undefined;
         });
     }
+    if (hasLayout) {
+        graphData.nodes.forEach(node => { node.y = node.fy; });
+    }
     Graph.graphData(graphData);
 });
 
@@ -358,26 +425,14 @@ document.getElementById('fly-mode').addEventListener('change', (e) => {
 // File Tree
 // ============================================================================
 
+// Built by graph_to_json: every level has 'dirs' (folder name -> sub-tree)
+// and 'files' ([file name, node index] pairs)
 function buildFileTree() {
-    const tree = {};
-    graphData.nodes.forEach(node => {
-        const parts = node.path.split('/');
-        let current = tree;
-        parts.forEach((part, i) => {
-            if (i === parts.length - 1) {
-                if (!current._files) current._files = [];
-                current._files.push({ name: part, node: node });
-            } else {
-                if (!current[part]) current[part] = {};
-                current = current[part];
-            }
-        });
-    });
-    return tree;
+    return graphData.metadata.fileTree;
 }
 
 function renderTree(tree, container) {
-    Object.keys(tree).filter(k => k !== '_files').sort().forEach(folder => {
+    Object.keys(tree.dirs).sort().forEach(folder => {
         const folderDiv = document.createElement('div');
         folderDiv.className = 'tree-folder';
         
@@ -392,20 +447,20 @@ function renderTree(tree, container) {
         
         const content = document.createElement('div');
         content.className = 'tree-folder-content';
-        renderTree(tree[folder], content);
+        renderTree(tree.dirs[folder], content);
         folderDiv.appendChild(content);
         
         container.appendChild(folderDiv);
     });
     
-    if (tree._files) {
-        tree._files.sort((a, b) => a.name.localeCompare(b.name)).forEach(file => {
+    if (tree.files.length) {
+        tree.files.sort((a, b) => a[0].localeCompare(b[0])).forEach(([fileName, nodeIdx]) => {
+            const node = graphData.nodes[nodeIdx];
             const fileDiv = document.createElement('div');
-            fileDiv.className = 'tree-file ' + (file.node.isHeader ? 'header' : 'source');
-            fileDiv.textContent = (file.node.isHeader ? '📄 ' : '📝 ') + file.name;
+            fileDiv.className = 'tree-file ' + (node.isHeader ? 'header' : 'source');
+            fileDiv.textContent = (node.isHeader ? '📄 ' : '📝 ') + fileName;
             fileDiv.onclick = () => {
-                const node = graphData.nodes.find(n => n.id === file.node.id);
-                if (node && node.x !== undefined) {
+                if (node.x !== undefined) {
                     Graph.cameraPosition(
                         { x: node.x + 150, y: node.y + 150, z: node.z + 150 },
                         node,
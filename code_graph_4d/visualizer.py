@@ -1,93 +1,286 @@
 """Generate 3D visualization HTML using 3d-force-graph."""
 
+import functools
+import gzip
 import json
+import re
 import webbrowser
+from importlib import resources
 from pathlib import Path
 from typing import Any
 
 import networkx as nx
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
-# Template directory
-TEMPLATE_DIR = Path(__file__).parent / 'templates'
 
+# Template directory, resolved through the package so it also works when
+# installed as a zip/zipapp
+TEMPLATE_DIR = resources.files(__package__) / 'templates'
 
-def _calc_radius(line_count: int) -> float:
-    """Calculate node size: lines / 2 = diameter = box edge length."""
-    lines = max(10, line_count)
-    return round(lines / 2, 2)
+# Community colors, indexed by each node's colorIdx; injected into
+# templates/graph.js as communityColors
+COMMUNITY_COLORS = (
+    '#e91e63', '#9c27b0', '#673ab7', '#3f51b5', '#2196f3',
+    '#00bcd4', '#009688', '#4caf50', '#8bc34a', '#cddc39',
+    '#ffeb3b', '#ffc107', '#ff9800', '#ff5722', '#795548',
+)
 
 
 def graph_to_json(G: nx.DiGraph) -> dict[str, Any]:
-    """Convert NetworkX graph to 3d-force-graph JSON format."""
-    max_level = max((attrs.get('level', 0) for _, attrs in G.nodes(data=True)), default=1)
-    max_level = max(max_level, 1)
-    
-    communities = set(attrs.get('community', 0) for _, attrs in G.nodes(data=True))
-    num_communities = len(communities)
-    
-    nodes = []
-    for node_id, attrs in G.nodes(data=True):
-        node_data = {
-            'id': node_id,
-            'name': attrs.get('name', node_id),
-            'path': attrs.get('path', node_id),
-            'type': attrs.get('type', 'source'),
-            'isHeader': attrs.get('is_header', False),
-            'classes': attrs.get('classes', []),
-            'structs': attrs.get('structs', []),
-            'functions': attrs.get('functions', []),
-            'complexity': attrs.get('complexity', 1),
-            'level': attrs.get('level', 0),
-            'community': attrs.get('community', 0),
-            'lineCount': attrs.get('line_count', 10),
-            'radius': _calc_radius(attrs.get('line_count', 10)),
-        }
-        nodes.append(node_data)
+    """Convert NetworkX graph to 3d-force-graph JSON format.
+    
+    Nodes and links are emitted column-wise (one list per attribute) so
+    that attribute names appear once in the payload rather than once per
+    node; the viewer rebuilds the objects 3d-force-graph needs on load.
+    """
+    items = list(G.nodes(data=True))
+    attrs_list = [attrs for _, attrs in items]
+    # Node ids are long relative paths; links refer to nodes by position
+    # instead, and the viewer uses that position as the node id
+    index = {node_id: i for i, (node_id, _) in enumerate(items)}
+    
+    levels = [attrs.get('level', 0) for attrs in attrs_list]
+    communities = [attrs.get('community', 0) for attrs in attrs_list]
+    line_counts = [attrs.get('line_count', 10) for attrs in attrs_list]
+    # 0/1 rather than false/true: one byte per node, and the viewer only
+    # tests truthiness
+    is_header = [1 if attrs.get('is_header') else 0 for attrs in attrs_list]
+    node_types = [attrs.get('type', 'source') for attrs in attrs_list]
+    
+    nodes = {
+        'name': [attrs.get('name', node_id) for node_id, attrs in items],
+        'path': [attrs.get('path', node_id) for node_id, attrs in items],
+        'complexity': [attrs.get('complexity', 1) for attrs in attrs_list],
+        'level': levels,
+        'community': communities,
+        # Palette slot, so the viewer's color accessor is a plain lookup
+        'colorIdx': [c % len(COMMUNITY_COLORS) for c in communities],
+        'lineCount': line_counts,
+        # Node size: lines / 2 = diameter = box edge length. Line counts are
+        # ints, so the halves are exact and need no rounding
+        'radius': [(n if n > 10 else 10) / 2 for n in line_counts],
+        'isHeader': is_header,
+    }
+    
+    # Symbol names repeat across files (a header declares what its source
+    # defines), so each one is shipped once in metadata.strings. Most files
+    # have no classes or structs, so these lists are sparse
+    # [node index, [string index, ...]] pairs rather than full columns
+    string_idx = {}
+    intern_string = string_idx.setdefault
+    # Identical symbol lists (e.g. a source defining exactly what its header
+    # declares) are encoded once and share one index list
+    encoded = {}
+    
+    def encode(names):
+        names = tuple(names)
+        ids = encoded.get(names)
+        if ids is None:
+            ids = [intern_string(name, len(string_idx)) for name in names]
+            encoded[names] = ids
+        return ids
     
-    in_degrees = dict(G.in_degree())
+    symbols = {
+        key: [
+            [i, encode(names)]
+            for i, attrs in enumerate(attrs_list)
+            if (names := attrs.get(key))
+        ]
+        for key in ('classes', 'structs', 'functions')
+    }
+    
+    # Read predecessor counts straight off the adjacency dict; about 2x
+    # faster than materializing the InDegreeView
+    in_degrees = {node: len(preds) for node, preds in G._pred.items()}
     max_in_degree = max(in_degrees.values()) if in_degrees else 1
     
-    links = []
-    for src, dst, attrs in G.edges(data=True):
-        target_in_degree = in_degrees.get(dst, 1)
-        links.append({
-            'source': src,
-            'target': dst,
-            'type': attrs.get('type', 'include'),
-            'weight': target_in_degree,
-        })
+    # Transpose the edge triples into columns and map them through the
+    # lookups with C-level map(); edges carry no type attribute by default
+    edges = list(G.edges(data='type', default='include'))
+    sources, targets, types = zip(*edges) if edges else ((), (), ())
+    links = {
+        'source': list(map(index.__getitem__, sources)),
+        'target': list(map(index.__getitem__, targets)),
+        'weight': list(map(in_degrees.__getitem__, targets)),
+    }
+    
+    # Node and link types are a handful of names; each is shipped once in
+    # metadata.typeTable and referred to by position
+    type_idx = {name: i for i, name in enumerate(dict.fromkeys([*node_types, *types]))}
+    nodes['typeCode'] = list(map(type_idx.__getitem__, node_types))
+    links['typeCode'] = list(map(type_idx.__getitem__, types))
     
+    header_count = sum(is_header)
     metadata = {
-        'maxLevel': max_level,
-        'numCommunities': num_communities,
+        'maxLevel': max(max(levels, default=0), 1),
+        # detect_communities numbers communities densely from 0, so the
+        # count is the largest id + 1 (0 for an empty graph)
+        'numCommunities': max(communities, default=-1) + 1,
         'maxInDegree': max_in_degree,
+        'headerCount': header_count,
+        'sourceCount': len(items) - header_count,
+        'strings': list(string_idx),
+        'typeTable': list(type_idx),
+        'fileTree': _file_tree(nodes['path']),
     }
     
-    return {'nodes': nodes, 'links': links, 'metadata': metadata}
+    graph_data = {
+        'nodes': nodes,
+        'links': links,
+        'symbols': symbols,
+        'metadata': metadata,
+    }
+    return graph_data
+
+
+def _layout_columns(G: nx.DiGraph) -> dict[str, list[float]]:
+    """Run a 3D spring layout once and return fixed fx/fy/fz node columns.
+    
+    Uses nx.spring_layout, so it needs NumPy (and SciPy from 500 nodes);
+    both come with the 'layout' extra.
+    """
+    # Spread grows with sqrt(N) so density stays roughly constant
+    scale = 20 * max(len(G), 1) ** 0.5
+    try:
+        pos = nx.spring_layout(G, dim=3, seed=0, scale=scale)
+    except ImportError as e:
+        raise ImportError(
+            f"precomputing the layout needs NumPy and SciPy "
+            f"(pip install 'code-graph-4d[layout]'): {e}"
+        ) from e
+    fx, fy, fz = zip(*(pos[node] for node in G)) if pos else ((), (), ())
+    return {
+        'fx': [round(float(v), 1) for v in fx],
+        'fy': [round(float(v), 1) for v in fy],
+        'fz': [round(float(v), 1) for v in fz],
+    }
+
+
+def _file_tree(paths: list[str]) -> dict[str, Any]:
+    """Nest node indices by path components for the viewer's file panel.
+    
+    Every level is {'dirs': {folder name: sub-tree}, 'files': [[file name,
+    node index], ...]}, so folder names never collide with the file list.
+    """
+    tree = {'dirs': {}, 'files': []}
+    for i, path in enumerate(paths):
+        *folders, name = path.split('/')
+        current = tree
+        for folder in folders:
+            dirs = current['dirs']
+            current = dirs.get(folder)
+            if current is None:
+                current = dirs[folder] = {'dirs': {}, 'files': []}
+        current['files'].append([name, i])
+    return tree
+
+
+def _dumps(data: Any) -> bytes:
+    """Serialize the graph payload to compact UTF-8 JSON, with orjson when available.
+    
+    Every '<' is written as '\\u003c' (still the same JSON string), so no
+    path or name can end the data block early or, via '<!--<script',
+    switch the HTML tokenizer into a state where the real '</script>'
+    no longer closes it.
+    """
+    payload = None
+    if HAS_ORJSON:
+        try:
+            payload = orjson.dumps(data)
+        except orjson.JSONEncodeError:
+            # orjson rejects strings that are not valid UTF-8, such as the
+            # lone surrogates of undecodable filenames; the stdlib escapes them
+            pass
+    if payload is None:
+        # ASCII-only output, so lone surrogates from undecodable filenames
+        # become \udcXX escapes instead of failing to encode; no cycle
+        # guard, since graph_to_json only ever builds a tree of lists/dicts
+        payload = json.dumps(
+            data, separators=(',', ':'), check_circular=False
+        ).encode('ascii')
+    # Paths almost never contain '<'; skip the copy a replace would make.
+    # '<' only occurs inside JSON strings, where the escape is equivalent
+    if b'<' in payload:
+        payload = payload.replace(b'<', b'\\u003c')
+    return payload
 
 
 def _load_template(name: str) -> str:
     """Load template file content."""
-    return (TEMPLATE_DIR / name).read_text(encoding='utf-8')
+    return (TEMPLATE_DIR / name).read_bytes().decode('utf-8')
+
+
+# Placeholders in templates/graph.html
+_PLACEHOLDER = re.compile(r'\{\{(TITLE|CSS|GRAPH_DATA|JS)\}\}')
 
 
-def generate_html(G: nx.DiGraph, output_path: Path, title: str = "Code Graph 4D") -> Path:
-    """Generate interactive 3D visualization HTML."""
-    graph_data = graph_to_json(G)
+@functools.lru_cache(maxsize=None)
+def _page_template() -> tuple[tuple[bytes, ...], tuple[str, ...]]:
+    """Return the page as UTF-8 literal chunks and the placeholders between them.
     
-    # Load templates
-    html_template = _load_template('graph.html')
-    css_content = _load_template('styles.css')
-    js_content = _load_template('graph.js')
+    CSS and JS never vary, so they are inlined here; what remains are the
+    per-call TITLE and GRAPH_DATA slots, with literals[i] preceding
+    names[i]. Built once per process.
+    """
+    js_content = _load_template('graph.js').replace(
+        '{{PALETTE}}', json.dumps(COMMUNITY_COLORS)
+    )
+    static = {'CSS': _load_template('styles.css'), 'JS': js_content}
+    parts = _PLACEHOLDER.split(_load_template('graph.html'))
+    literals = [parts[0]]
+    names = []
+    for name, literal in zip(parts[1::2], parts[2::2]):
+        if name in static:
+            literals[-1] += static[name] + literal
+        else:
+            names.append(name)
+            literals.append(literal)
+    return tuple(chunk.encode('utf-8') for chunk in literals), tuple(names)
+
+
+def generate_html(
+    G: nx.DiGraph,
+    output_path: Path,
+    title: str = "Code Graph 4D",
+    compress: bool = False,
+    precompute_layout: bool = False,
+    graph_data: dict[str, Any] | None = None,
+) -> Path:
+    """Generate interactive 3D visualization HTML.
     
-    # Replace placeholders
-    html_content = html_template.replace('{{TITLE}}', title)
-    html_content = html_content.replace('{{CSS}}', css_content)
-    html_content = html_content.replace('{{GRAPH_DATA}}', json.dumps(graph_data))
-    html_content = html_content.replace('{{JS}}', js_content)
+    With compress=True a gzip copy is also written next to it (e.g.
+    code_graph.html.gz), ready to serve with Content-Encoding: gzip.
+    With precompute_layout=True node positions are computed here and
+    pinned, so the browser skips the force simulation. A payload already
+    returned by graph_to_json(G) can be passed as graph_data to reuse it.
+    """
+    if graph_data is None:
+        graph_data = graph_to_json(G)
+    if precompute_layout:
+        # A copy, so a payload passed in by the caller is left untouched
+        graph_data = {
+            **graph_data,
+            'nodes': {**graph_data['nodes'], **_layout_columns(G)},
+        }
+    literals, names = _page_template()
+    values = {'TITLE': title.encode('utf-8'), 'GRAPH_DATA': _dumps(graph_data)}
     
-    output_path.write_text(html_content, encoding='utf-8')
+    # Everything is already UTF-8, so the payload is written without a
+    # decode/encode round trip, and no chunk is scanned for placeholders
+    segments = [literals[0]]
+    for name, literal in zip(names, literals[1:]):
+        segments += (values[name], literal)
+    with output_path.open('wb') as f:
+        f.writelines(segments)
+    if compress:
+        gz_path = output_path.with_name(output_path.name + '.gz')
+        with gzip.open(gz_path, 'wb', compresslevel=6) as f:
+            f.writelines(segments)
     return output_path
 
 
@@ -0,0 +1,22 @@
+"""Tests for dependency graph construction."""
+
+from pathlib import PureWindowsPath
+
+from code_graph_4d.graph_builder import build_dependency_graph
+from code_graph_4d.parser import FileInfo
+
+
+def test_windows_paths_resolve_relative_and_partial_includes():
+    root = PureWindowsPath('C:/proj')
+    files = [
+        FileInfo(root / 'Source/Core/Engine.h', is_header=True),
+        FileInfo(root / 'Source/UI/Widget.h', includes=('../Core/Engine.h',), is_header=True),
+        FileInfo(root / 'Source/UI/Widget.cpp', includes=('UI/Widget.h',)),
+    ]
+    G = build_dependency_graph(files, root)
+    
+    assert set(G) == {'Source/Core/Engine.h', 'Source/UI/Widget.h', 'Source/UI/Widget.cpp'}
+    assert set(G.edges()) == {
+        ('Source/UI/Widget.h', 'Source/Core/Engine.h'),
+        ('Source/UI/Widget.cpp', 'Source/UI/Widget.h'),
+    }
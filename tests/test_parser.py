@@ -0,0 +1,58 @@
+"""Tests for C++ declaration parsing."""
+
+import pytest
+
+from code_graph_4d import parser as parser_module
+from code_graph_4d.parser import HAS_TREE_SITTER, CppParser
+
+
+SOURCE = b"""\
+int counter = 0;
+
+class Outer {
+    struct Inner {
+        int x;
+    };
+    void method();
+};
+
+struct Point { int x, y; };
+
+void Outer::method() {}
+
+static int helper(int a) { return a; }
+
+class Second {};
+
+int limit = 10;
+
+int main() { return helper(limit); }
+"""
+
+
+@pytest.mark.skipif(not HAS_TREE_SITTER, reason="tree-sitter not installed")
+@pytest.mark.parametrize('reverse', [False, True])
+def test_declarations_are_in_source_order(tmp_path, monkeypatch, reverse):
+    path = tmp_path / 'sample.cpp'
+    path.write_bytes(SOURCE)
+    
+    if reverse:
+        # tree-sitter makes no ordering promise; simulate the worst case
+        real_cursor = parser_module.QueryCursor
+        
+        class ReversedCursor:
+            def __init__(self, query):
+                self._cursor = real_cursor(query)
+            
+            def captures(self, node):
+                found = self._cursor.captures(node)
+                return {name: nodes[::-1] for name, nodes in found.items()}
+        
+        monkeypatch.setattr(parser_module, 'QueryCursor', ReversedCursor)
+    
+    info = CppParser().parse_file(path)
+    assert info.classes == ('Outer', 'Second')
+    assert info.structs == ('Inner', 'Point')
+    # Outer::method is a member definition and is not listed
+    assert info.functions == ('helper', 'main')
+    assert info.global_vars == ('counter', 'limit')
@@ -0,0 +1,79 @@
+"""Tests for the graph payload built by the visualizer."""
+
+import json
+
+import networkx as nx
+
+from code_graph_4d import visualizer
+from code_graph_4d.graph_builder import detect_communities, enrich_graph_with_analysis
+from code_graph_4d.visualizer import graph_to_json
+
+
+def _two_cluster_graph() -> nx.DiGraph:
+    G = nx.DiGraph()
+    G.add_edges_from([('a.cpp', 'a.h'), ('a.h', 'b.h'), ('b.h', 'a.h')])
+    G.add_edges_from([('x.cpp', 'x.h'), ('x.h', 'y.h'), ('y.h', 'x.h')])
+    return G
+
+
+def test_graph_to_json_reflects_in_place_enrichment():
+    G = _two_cluster_graph()
+    before = graph_to_json(G)
+    assert before['metadata']['numCommunities'] == 1
+    
+    # Changes level/community attributes without changing node/edge counts
+    enrich_graph_with_analysis(G)
+    after = graph_to_json(G)
+    
+    communities = detect_communities(G)
+    assert after is not before
+    assert after['metadata']['numCommunities'] == len(set(communities.values()))
+    assert after['metadata']['numCommunities'] > 1
+    assert after['nodes']['community'] == [communities[n] for n in G]
+    assert after['nodes']['level'] == [G.nodes[n]['level'] for n in G]
+
+
+def _undecodable_name_graph() -> nx.DiGraph:
+    # What str(Path) yields on Linux for the file name b'caf\xe9.h'
+    name = b'caf\xe9.h'.decode('utf-8', 'surrogateescape')
+    G = nx.DiGraph()
+    G.add_node(name, path=name, name=name, classes=(name,))
+    G.add_edge('main.cpp', name)
+    return G
+
+
+def test_dumps_escapes_undecodable_filenames(monkeypatch):
+    G = _undecodable_name_graph()
+    data = graph_to_json(G)
+    for has_orjson in {visualizer.HAS_ORJSON, False}:
+        monkeypatch.setattr(visualizer, 'HAS_ORJSON', has_orjson)
+        assert json.loads(visualizer._dumps(data)) == json.loads(json.dumps(data))
+
+
+def test_generate_html_with_undecodable_filename(tmp_path):
+    out = visualizer.generate_html(_undecodable_name_graph(), tmp_path / 'graph.html')
+    assert b'caf\\udce9.h' in out.read_bytes()
+
+
+def test_generate_html_escapes_markup_in_payload(tmp_path):
+    name = 'a<!--<script>b</script>.h'
+    G = nx.DiGraph()
+    G.add_node(name, path=name, name=name)
+    html = visualizer.generate_html(G, tmp_path / 'graph.html').read_text(encoding='utf-8')
+    
+    start = html.index('<script type="application/json" id="graph-data">')
+    block = html[html.index('>', start) + 1:html.index('</script>', start)]
+    assert '<' not in block
+    assert json.loads(block)['nodes']['path'] == [name]
+
+
+def test_file_tree_keeps_folders_apart_from_files():
+    for paths in (['foo.h', '_files/bar.h'], ['_files/bar.h', 'foo.h']):
+        G = nx.DiGraph()
+        G.add_nodes_from((p, {'path': p}) for p in paths)
+        tree = graph_to_json(G)['metadata']['fileTree']
+        
+        assert tree['files'] == [['foo.h', paths.index('foo.h')]]
+        assert tree['dirs'] == {
+            '_files': {'dirs': {}, 'files': [['bar.h', paths.index('_files/bar.h')]]},
+        }